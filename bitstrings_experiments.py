@@ -6,7 +6,7 @@ The experiments are done using all three learning methods
 import time
 import matplotlib.pyplot as plt
 
-from value_iterations import ValueIteration
+from value_iterations import BatchedValueIteration
 from policy_iteration import PolicyIteration
 from q_learning import QLearning
 from mdp import BitStrings
@@ -26,17 +26,17 @@ print("\n- Using value iterations")
 fig = plt.figure(figsize=(10,8))
 ax = fig.add_subplot(1,1,1)
 grid_search = [(0.1, 0.0001), (0.9, 0.0001), (1, 0.0001), (1, 0.1)]  # List of hyper-param (gamma, eps)
-vi_results = {}   # Time of exetution and last state-value for different hyperparameter value
+vi_results = {}   # Last state-value for different hyperparameter value
 optimum_policy = None
 best_state_value = 0
 c_i = 0
-for gamma, eps in grid_search:
-    begin_tstamp = time.time()
-    value_iter = ValueIteration(bitstrings, gamma=gamma, epsilon=eps)
-    trained_policy, mean_state_values = value_iter()
+# All the hyper-params are swept together, so they share the execution time
+begin_tstamp = time.time()
+batched_results = BatchedValueIteration(bitstrings, grid_search)()
+end_tstamp = time.time()
+for (gamma, eps), (trained_policy, mean_state_values) in zip(grid_search, batched_results):
     ax.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
-    end_tstamp = time.time()
-    vi_results[(gamma, eps)] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
+    vi_results[(gamma, eps)] = mean_state_values[-1]
     if mean_state_values[-1] > best_state_value:
         optimum_policy = trained_policy
         best_state_value = mean_state_values[-1]
@@ -48,9 +48,10 @@ ax.legend()
 fig.savefig("./plots/bitstrings_value_iterations.png")
 plt.close(fig)
 print("  - Results")
-print("\tGamma\tEpsilon\tExecution time\tV(s)")
+print(f"\tExecution time of the batched sweep: {end_tstamp - begin_tstamp:.5f}")
+print("\tGamma\tEpsilon\tV(s)")
 for key, value in vi_results.items():
-    print(f"\t{key[0]}\t{key[1]}\t{value[0]:.5f}\t\t{value[1]:.2f}")
+    print(f"\t{key[0]}\t{key[1]}\t{value:.2f}")
 fig = plt.figure(figsize=(10,8))
 ax = fig.add_subplot(1,1,1)
 bit_string_value = list(range(len(optimum_policy)))
@@ -134,9 +135,9 @@ for alpha, eps in grid_search:
         optimum_policy = trained_policy
         best_state_value = mean_state_values[-1]
     c_i += 1
-ax.set_xlabel("Number of iterations")
+ax.set_xlabel("Number of episodes")
 ax.set_ylabel("Average state value V(s)")
-ax.set_title("Average state value VS No. of iterations for Policy Iterations")
+ax.set_title("Average state value VS No. of episodes for Q Learning")
 ax.legend()
 fig.savefig("./plots/bitstrings_q_learning.png")
 plt.close(fig)
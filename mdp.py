@@ -1,6 +1,7 @@
 # This module defines the 2 MDPs used in this project
 
 import random
+import numpy as np
 
 
 class MDP:
@@ -17,6 +18,26 @@ class MDP:
         """ Return all the terminal states """
         pass
 
+    def get_terminal_mask(self):
+        """ Get which of the allowed states are terminal
+        States are indexed in the order of `get_allowed_states_and_actions`
+        Returns:
+            terminal_mask (np.ndarray of bool)
+        """
+        allowed_states, _ = self.get_allowed_states_and_actions()
+        terminal_states = self.get_terminal_states()
+        return np.array([s in terminal_states for s in allowed_states])
+
+    def _mask_terminal(self, P, R):
+        """ Remove the transitions out of the terminal states, in-place
+        Parameters:
+            P: transition probabilities P[s, a, s'] (np.ndarray)
+            R: rewards R[s, a, s'] (np.ndarray)
+        """
+        terminal_mask = self.get_terminal_mask()
+        P[terminal_mask] = 0
+        R[terminal_mask] = 0
+
     def get_transition_prob(self, state, action, next_state):
         """ Get transition probability for (state, action, next_state)
         Parameters:
@@ -39,6 +60,40 @@ class MDP:
         """
         pass
 
+    def get_transition_tensors(self):
+        """ Build the dense transition and reward tensors of the MDP
+        States and actions are indexed in the order of `get_allowed_states_and_actions`
+        Returns:
+            P: transition probabilities P[s, a, s'] (np.ndarray)
+            R: rewards R[s, a, s'] (np.ndarray)
+        """
+        allowed_states, allowed_actions = self.get_allowed_states_and_actions()
+        S, A = len(allowed_states), len(allowed_actions)
+        P = np.zeros((S, A, S))
+        R = np.zeros((S, A, S))
+        for i, s in enumerate(allowed_states):
+            for j, a in enumerate(allowed_actions):
+                for k, s_prime in enumerate(allowed_states):
+                    P[i, j, k] = self.get_transition_prob(s, a, s_prime)
+                    R[i, j, k] = self.get_reward(s, a, s_prime)
+        self._mask_terminal(P, R)
+        return P, R
+
+    def get_successors(self):
+        """ Get the sparse successors of every (state, action) pair
+        States and actions are indexed in the order of `get_allowed_states_and_actions`
+        Returns:
+            successors[s][a]: List[(s', p, r)] for the next states s' with non-zero probability p
+        """
+        P, R = self.get_transition_tensors()
+        successors = []
+        for s in range(P.shape[0]):
+            successors.append([])
+            for a in range(P.shape[1]):
+                successors[s].append([(int(s_prime), float(P[s, a, s_prime]), float(R[s, a, s_prime]))
+                                      for s_prime in np.nonzero(P[s, a])[0]])
+        return successors
+
     def reset(self):
         """ Reset the MDP
         Returns: initial_state, reward(int), episode_end(False)
@@ -71,51 +126,77 @@ class TomAndJerry(MDP):
         If there is a trap/grid-border in any direction, the movement does not happen
     """
 
-    def __init__(self):
+    def __init__(self, seed=None):
+        """ Constructor
+        Parameters:
+            - seed: seed of the random number generator used by `step' (int)
+        """
+        self._rng = random.Random(seed)
         self.jerry = (0, 0)  # Current position of Jerry
         self.tom = (1,3)     # Position of Tom
         self.cheeze = (2,3)  # Position of Cheeze
         self.traps = set([(2,2), (3,0)])       # Position of traps
         self.allowed_actions = set([0,1,2,3])  # Allowed actions
+        self._terminal = frozenset([self.tom, self.cheeze])  # Terminal states
+        self._allowed_states_actions = None  # Cached allowed states and actions
+        self._dx = (-1, 0, 1, 0)  # Row change for each action
+        self._dy = (0, 1, 0, -1)  # Column change for each action
+        self._perp = {0: (1,3), 1: (0,2), 2: (1,3), 3: (0,2)}  # Perpendicular actions for each action
+        # Index of each allowed state and the transition/reward tables indexed as [s, a, s']
+        allowed_states, _ = self.get_allowed_states_and_actions()
+        self.s2i = {s: i for i, s in enumerate(allowed_states)}
+        self.P, self.R = self.__build_transition_tensors()
+
+    def __build_transition_tensors(self):
+        """ Build the transition and reward tables from the movement rules
+        Returns:
+            P[s, a, s'], R[s, a, s'] (np.ndarray)
+        """
+        allowed_states, allowed_actions = self.get_allowed_states_and_actions()
+        S, A = len(allowed_states), len(allowed_actions)
+        P = np.zeros((S, A, S))
+        R = np.zeros((S, A, S))
+        for s in allowed_states:
+            for action in allowed_actions:
+                for a in (action,) + self._perp[action]:
+                    # Jerry stays in place if the movement is blocked
+                    new_x = s[0] + self._dx[a]
+                    new_y = s[1] + self._dy[a]
+                    s_prime = s
+                    if (new_x, new_y) not in self.traps and 0 <= new_x <= 3 and 0 <= new_y <= 3:
+                        s_prime = (new_x, new_y)
+                    P[self.s2i[s], action, self.s2i[s_prime]] += 1/3
+                    R[self.s2i[s], action, self.s2i[s_prime]] = self.get_reward(s, action, s_prime)
+        self._mask_terminal(P, R)
+        return P, R
 
     def get_allowed_states_and_actions(self):
-        # Get all the allowed states
-        allowed_states = []
-        for r in range(4):
-            for c in range(4):
-                if (r,c) not in self.traps:
-                    allowed_states.append((r,c))
-        # Get the allowed actions
-        allowed_actions = list(self.allowed_actions)
-        return allowed_states, allowed_actions
+        if self._allowed_states_actions is None:
+            # Get all the allowed states
+            allowed_states = []
+            for r in range(4):
+                for c in range(4):
+                    if (r,c) not in self.traps:
+                        allowed_states.append((r,c))
+            # Get the allowed actions
+            allowed_actions = list(self.allowed_actions)
+            self._allowed_states_actions = (allowed_states, allowed_actions)
+        return self._allowed_states_actions
 
     def get_terminal_states(self):
-        return [self.tom, self.cheeze]
+        return self._terminal
+
+    def get_transition_tensors(self):
+        return self.P, self.R
 
     def get_transition_prob(self, state, action, next_state):
-        # If the state is out of bonds
-        if state[0] < 0 or state[0] > 3 or state[1] < 0 or state[1] > 3:
+        # If the states are out of bonds or traps
+        if state not in self.s2i or next_state not in self.s2i:
             return 0
         # If action is out of bonds
         if action not in self.allowed_actions:
             return 0
-        # If the state is terminal
-        if state in self.get_terminal_states():
-            return 0
-        # Get the possible next_states from the current state
-        possible_next_states = set()
-        dx = [-1, 0, 1, 0]
-        dy = [0, 1, 0, -1]
-        possible_actions = [1,3] if action%2 == 0 else [0,2]
-        possible_actions += [action]
-        for a in possible_actions:
-            new_x = state[0] + dx[a]
-            new_y = state[1] + dy[a]
-            if (new_x, new_y) not in self.traps and 0 <= new_x <= 3 and 0 <= new_y <= 3:
-                possible_next_states.add((new_x, new_y))
-        if next_state in possible_next_states:
-            return 1/3
-        return 0
+        return self.P[self.s2i[state], action, self.s2i[next_state]]
 
     def get_reward(self, state, action, next_state):
         if next_state == self.tom:
@@ -134,17 +215,14 @@ class TomAndJerry(MDP):
         if action not in self.allowed_actions:
             raise Exception(f"'{action}' is not a valid action")
         # Do nothing if the game has ended
-        if self.jerry in self.get_terminal_states():
+        if self.jerry in self._terminal:
             return self.jerry, 0, True
         # Update Jerry's position using the transition model
-        if action%2 == 0:
-            action = random.choice([action] + [1,3])
-        else:
-            action = random.choice([action] + [0,2])
-        dx = [-1, 0, 1, 0]
-        dy = [0, 1, 0, -1]
-        new_x = self.jerry[0] + dx[action]
-        new_y = self.jerry[1] + dy[action]
+        p = self._rng.random() * 3
+        if p >= 1:
+            action = self._perp[action][0] if p < 2 else self._perp[action][1]
+        new_x = self.jerry[0] + self._dx[action]
+        new_y = self.jerry[1] + self._dy[action]
         reward = 0
         episode_end = False
         if (new_x, new_y) not in self.traps and 0 <= new_x <= 3 and 0 <= new_y <= 3:
@@ -159,6 +237,7 @@ class BitStrings(MDP):
     """ Concrete MDP for Bit Strings of size 9
 
     - 9 is upper limit on size of the problem
+    - States are the integer values of the bit strings, with bit 0 being the most significant bit
     - Start from "All zeros" (eg: "000000000")
     - Rewards:
         +1 reward for "Alternating zeros-ones" (eg: "010101010" or "101010101")
@@ -170,63 +249,86 @@ class BitStrings(MDP):
         For the last bit, it is guranteed to flip as there is no next bit to it
     """
 
-    def __init__(self, size=9):
+    def __init__(self, size=9, seed=None):
         """ Constructor
         Parameters:
             - size: size of the bitstrings used (int)
+            - seed: seed of the random number generator used by `step' (int)
         """
+        self._rng = random.Random(seed)
         self.size = min(size, 9)  # 9 is the upper limit on size of the problem
-        self.start_state = "0" * self.size
-        self.positive_terminal_states = [("01"*5)[0:self.size], ("10"*5)[0:self.size]]
-        self.negative_terminal_states = ["1" * self.size]
+        self.start_state = 0
+        self.positive_terminal_states = [int(("01"*5)[0:self.size], 2), int(("10"*5)[0:self.size], 2)]
+        self.negative_terminal_states = [(1 << self.size) - 1]
         self.state = self.start_state
+        self._terminal = frozenset(self.positive_terminal_states + self.negative_terminal_states)  # Terminal states
+        self._allowed_states_actions = None  # Cached allowed states and actions
+        # Reward for reaching each state
+        self._reward_table = np.zeros(1 << self.size, dtype=np.int8)
+        self._reward_table[self.positive_terminal_states] = 1
+        self._reward_table[self.negative_terminal_states] = -2
+        # Transition and reward tables indexed as [s, a, s']
+        self.P, self.R = self.__build_transition_tensors()
+
+    def __bit(self, action):
+        """ Mask of the bit flipped by `action' """
+        return 1 << (self.size - 1 - action)
+
+    def to_string(self, state):
+        """ Get the bit string representation of a state
+        Parameters:
+            state: state (int)
+        Returns:
+            bit string (str)
+        """
+        return format(state, f"0{self.size}b")
 
-    def __generate_allowed_states(self, state, allowed_states):
-        if len(state) == self.size:
-            allowed_states.append(state)
-            return
-        self.__generate_allowed_states(state + '0', allowed_states)
-        self.__generate_allowed_states(state + '1', allowed_states)
-        return
+    def __build_transition_tensors(self):
+        """ Build the transition and reward tables using bitmasks
+        Returns:
+            P[s, a, s'], R[s, a, s'] (np.ndarray)
+        """
+        S, A = 1 << self.size, self.size
+        states = np.arange(S)[:, None]
+        actions = np.arange(A)[None, :]
+        # States reached by flipping the selected bit and the next bit (the selected bit for the last one)
+        next1 = states ^ (1 << (self.size - 1 - actions))
+        next2 = np.where(actions < self.size - 1, states ^ (1 << np.maximum(self.size - 2 - actions, 0)), next1)
+        states, actions = np.broadcast_arrays(states, actions)
+        P = np.zeros((S, A, S))
+        np.add.at(P, (states, actions, next1), 0.5)
+        np.add.at(P, (states, actions, next2), 0.5)
+        # The reward only depends on the next state
+        R = np.broadcast_to(self._reward_table.astype(float), (S, A, S)).copy()
+        self._mask_terminal(P, R)
+        return P, R
 
     def get_allowed_states_and_actions(self):
-        # Get all the allowed states
-        allowed_states = []
-        self.__generate_allowed_states("", allowed_states)
-        # Get the allowed actions
-        allowed_actions = list(range(self.size))
-        return allowed_states, allowed_actions
+        if self._allowed_states_actions is None:
+            # Get all the allowed states
+            allowed_states = list(range(1 << self.size))
+            # Get the allowed actions
+            allowed_actions = list(range(self.size))
+            self._allowed_states_actions = (allowed_states, allowed_actions)
+        return self._allowed_states_actions
 
     def get_terminal_states(self):
-        return self.positive_terminal_states + self.negative_terminal_states
+        return self._terminal
+
+    def get_transition_tensors(self):
+        return self.P, self.R
 
     def get_transition_prob(self, state, action, next_state):
         # If action is out of bonds
         if action < 0 or action > self.size - 1:
             return 0
-        # If the state is terminal
-        if state in self.get_terminal_states():
+        # If the states are out of bonds
+        if not 0 <= state < 1 << self.size or not 0 <= next_state < 1 << self.size:
             return 0
-        # Get the possible next_states from the current state
-        possible_next_states = set()
-        new_bit_value = 1 - int(state[action])
-        possible_next_states.add(state[0:action] + str(new_bit_value) + state[action+1:])
-        if action < self.size - 1:
-            action = action + 1
-            new_bit_value = 1 - int(state[action])
-            possible_next_states.add(state[0:action] + str(new_bit_value) + state[action+1:])
-        # Return the probability
-        if next_state in possible_next_states:
-            return 0.5
-        return 0
+        return self.P[state, action, next_state]
 
     def get_reward(self, state, action, next_state):
-        if next_state in self.negative_terminal_states :
-            return -2
-        elif next_state in self.positive_terminal_states:
-            return 1
-        else:
-            return 0
+        return int(self._reward_table[next_state])
 
     def reset(self):
         self.state = self.start_state
@@ -236,13 +338,12 @@ class BitStrings(MDP):
         if action < 0 or action > self.size - 1:
             raise Exception(f"Action at index {action} is out of bounds")
         # Do nothing if the game has ended
-        if self.state in self.get_terminal_states():
+        if self.state in self._terminal:
             return self.state, 0, True
         # Update state using the transition model
-        if action < self.size - 1:
-            action = random.choice([action, action+1])
-        new_bit_value = 1 - int(self.state[action])
-        next_state = self.state[0:action] + str(new_bit_value) + self.state[action+1:]
+        if action < self.size - 1 and self._rng.random() < 0.5:
+            action = action + 1
+        next_state = self.state ^ self.__bit(action)
         reward = self.get_reward(self.state, action, next_state)
         self.state = next_state
         episode_end = False
@@ -274,14 +375,14 @@ if __name__ == "__main__":
     print("- - - - - - - - - - -    ")
     bit_strings = BitStrings()
     s, _, _ = bit_strings.reset()
-    print("- Initial state: ", s)
+    print("- Initial state: ", bit_strings.to_string(s))
     s, _, _ = bit_strings.step(1)
-    print("- New state post transition: ", s)
-    p = bit_strings.get_transition_prob("000000000", 2, "001000000")
+    print("- New state post transition: ", bit_strings.to_string(s))
+    p = bit_strings.get_transition_prob(0b000000000, 2, 0b001000000)
     print("- Transition prob. for " + str(["000000000", 2, "001000000"]) + " is", p)
     s, a = bit_strings.get_allowed_states_and_actions()
     print("- Number of states: ", len(s))
     print("- Number of actions: ", len(a))
     t_s = bit_strings.get_terminal_states()
-    print("- Terminal states: ", t_s)
+    print("- Terminal states: ", [bit_strings.to_string(s) for s in t_s])
     print()
@@ -1,54 +1,58 @@
 # This module implements the policy iteration
 
 import random
+import numpy as np
 
 
 class PolicyIteration:
 
     """ Finds optimum policy using Policy Iteration """
 
-    def __init__(self, mdp, gamma=0.9, epsilon=0.0001):
+    def __init__(self, mdp, gamma=0.9, epsilon=0.0001, seed=None):
         """ Constructor
         Parameters:
             - mdp: Markov devision process object
             - gamma: Discount factor
             - epsilon: The threshold to stop the value iterations
+            - seed: Seed of the random number generator used for the initial policy
         """
+        self._rng = random.Random(seed)
         self.mdp = mdp    # MDP to train policy for
         self.gamma = gamma
         self.eps = epsilon
         self.allowed_states, self.allowed_actions = self.mdp.get_allowed_states_and_actions()
-        self.V = {}       # Value function
+        self.s2i = {s: i for i, s in enumerate(self.allowed_states)}  # Index of each state in V
+        # Transition and reward tensors indexed as [s, a, s']
+        self.P, self.R = self.mdp.get_transition_tensors()
+        # Expected immediate rewards [s, a], shared by the policy evaluation and update
+        self.r = (self.P * self.R).sum(-1)
+        self.V = np.zeros(len(self.allowed_states))  # Value function
         self.policy = {}  # Policy
-        # Initialize a random policy
-        for s in self.allowed_states:
-            self.policy[s] = random.choice(self.allowed_actions)
+        # Initialize a random policy (index of the action for each state)
+        self.pi = np.array([self._rng.randrange(len(self.allowed_actions)) for _ in self.allowed_states])
 
-    def __Q(self, s, a):
-        """ Evaluate optimum Q(s,a)
-        Paramaters:
-            - s: Current state
-            - a: Current action
+    def __Q(self):
+        """ Evaluate Q(s,a) for all the states and actions using the current V
         Returns:
-            Optimum Q(s,a)
+            Q (np.ndarray of shape [S, A])
         """
-        Q_s_a = 0
-        for s_prime in self.allowed_states:
-            Q_s_a += self.mdp.get_transition_prob(s, a, s_prime) * (self.mdp.get_reward(s, a, s_prime) + self.gamma * self.V[s_prime])
-        return Q_s_a
+        return self.r + self.gamma * (self.P @ self.V)
 
     def __evaluate_policy(self):
         """ Estimate the on policy value function for the current policy """
-        # Initialize the value function to 0
-        for s in self.allowed_states:
-            self.V[s] = 0
-        # Update using the Bellamn equation till convergence
+        states = np.arange(len(self.allowed_states))
+        P_pi = self.P[states, self.pi]  # Transitions under the current policy [s, s']
+        r_pi = self.r[states, self.pi]  # Expected rewards under the current policy [s]
+        # Solve (I - gamma * P_pi) V = r_pi directly when the system is non-singular
+        if self.gamma < 1:
+            self.V = np.linalg.solve(np.eye(len(states)) - self.gamma * P_pi, r_pi)
+            return
+        # Otherwise update using the Bellamn equation till convergence, starting from the
+        # previous policy's values so that near-ties settle instead of making the policy oscillate
         while True:
-            delta = 0
-            for s in self.allowed_states:
-                old_v = self.V[s]
-                self.V[s] = self.__Q(s, self.policy[s])
-                delta = max(delta, abs(old_v - self.V[s]))
+            V_new = r_pi + self.gamma * P_pi @ self.V
+            delta = np.max(np.abs(V_new - self.V))
+            self.V = V_new
             if delta < self.eps:
                 break
         return
@@ -58,13 +62,13 @@ class PolicyIteration:
         Returns:
             Mean of action changes for all the states
         """
-        total_policy_change = 0   # Sum of | old_action - new_action | for each state
-        for s in self.allowed_states:
-            old_a = self.policy[s]
-            Q_s = [self.__Q(s,a) for a in self.allowed_actions]
-            self.policy[s] = Q_s.index(max(Q_s))  # argmax_a[ Q(s,a) ]
-            total_policy_change += abs(old_a - self.policy[s])
-        return total_policy_change/len(self.allowed_states)
+        old_pi = self.pi
+        Q = self.__Q()
+        # argmax_a[ Q(s,a) ], taking the first action within round-off of the max so that
+        # ties do not depend on the random initial policy
+        self.pi = (Q >= Q.max(1, keepdims=True) - 1e-12).argmax(1)
+        # Mean of | old_action - new_action | for each state
+        return np.abs(old_pi - self.pi).mean()
 
     def __call__(self):
         """ Execute the policy iteration using Bellman Equation
@@ -78,12 +82,14 @@ class PolicyIteration:
         while True:
             # Policy evaluation
             self.__evaluate_policy()
-            mean_state_values.append(sum(self.V.values())/len(self.V))
+            mean_state_values.append(self.V.mean())
             # Policy update
             mean_change = self.__policy_update()
             mean_policy_changes.append(mean_change)
             if mean_change == 0:
                 break
+        for s, i in self.s2i.items():
+            self.policy[s] = self.allowed_actions[self.pi[i]]
         return self.policy, mean_policy_changes, mean_state_values
 
 
@@ -1,54 +1,97 @@
 # This module implements Q-learning
 
 import random
+import numpy as np
+from numba import njit
 from tqdm import tqdm
 
 
+# The kernels are compiled eagerly at import (explicit signatures), so that the first
+# QLearning run does not pay the compilation/cache loading inside its execution time
+@njit("void(int64)", cache=True)
+def _seed(seed):
+    """ Seed the random number generator used by the compiled functions """
+    np.random.seed(seed)
+
+
+@njit("float64(float64[:, :], float64[:, :, :], float64[:, :, :], boolean[:], int64, int64, int64, "
+      "float64, float64, float64, float32[:])", cache=True)
+def _q_learning(Q, P_cum, R, terminal, start, first_episode, num_episodes, alpha, gamma, eps, mean_state_values):
+    """ Run Q-Learning on the tabular transition model
+    Parameters:
+        - Q: Q-values indexed as [s, a], updated in-place (np.ndarray)
+        - P_cum: cumulative transition probabilities indexed as [s, a, s'] (np.ndarray)
+        - R: rewards indexed as [s, a, s'] (np.ndarray)
+        - terminal: whether each state is terminal (np.ndarray of bool)
+        - start: index of the initial state (int)
+        - first_episode: index of the first episode to run (int)
+        - num_episodes: number of episodes (int)
+        - alpha: learning rate (float)
+        - gamma: discount factor (float)
+        - eps: initial exploration probability (float)
+        - mean_state_values: mean state value after each episode, written in-place (np.ndarray)
+    Returns:
+        - Exploration probability after the last episode
+    """
+    S, A = Q.shape
+    # Track argmax_a Q(s,a) and max_a Q(s,a) for every state to update mean V in O(A) per step
+    greedy = np.empty(S, dtype=np.int64)
+    V = np.empty(S)
+    for s in range(S):
+        greedy[s] = np.argmax(Q[s])
+        V[s] = Q[s, greedy[s]]
+    sum_V = V.sum()
+    for episode in range(first_episode, first_episode + num_episodes):
+        eps = 0.9995 * eps  # Reduce the exploration is a step-wise manner
+        s = start
+        episode_end = False
+        while not episode_end:
+            # Select the action in epsilon-greedy fashion
+            if np.random.random() < eps:
+                a = np.random.randint(0, A)
+            else:
+                a = greedy[s]
+            # Sample the next state, the remaining probability mass keeps the state unchanged
+            s_prime = np.searchsorted(P_cum[s, a], np.random.random(), side="right")
+            if s_prime == S:
+                s_prime = s
+            r = R[s, a, s_prime]
+            Q[s, a] = Q[s, a] + alpha * (r + gamma * V[s_prime] - Q[s, a])
+            greedy[s] = np.argmax(Q[s])
+            sum_V += Q[s, greedy[s]] - V[s]
+            V[s] = Q[s, greedy[s]]
+            episode_end = terminal[s_prime]
+            s = s_prime  # Update as current state
+        mean_state_values[episode + 1] = sum_V / S
+    return eps
+
+
 class QLearning:
 
     """ Find optimum policy using Q-Learning """
 
-    def __init__(self, mdp, alpha=0.01, gamma=0.9, eps=1):
+    def __init__(self, mdp, alpha=0.01, gamma=0.9, eps=1, seed=None):
         """ Constructor
         Parameters:
             - mdp: Markov Decision Process object
             - alpha: learning rate (float)
             - gamma: discount factor (float)
-            - eps: expl
-            pass
+            - eps: initial exploration probability (float)
+            - seed: seed of the random number generator (int)
         """
+        self._rng = random.Random(seed)
         self.mdp = mdp
         self.alpha = alpha
         self.gamma = gamma
         self.eps = eps
-        self.Q = {}
-        # Initialize the Q-values to 0
         self.allowed_states, self.allowed_actions = self.mdp.get_allowed_states_and_actions()
-        for s in self.allowed_states:
-            self.Q[s] = [0]*len(self.allowed_actions)
-
-    def __select_action(self, s):
-        """ Select action using epsilon-greedy
-        Parameters:
-            - s: State for which to select the action
-        Returns:
-            - Selected action
-        """
-        p = random.random()
-        if p < self.eps:  # Return a randomly selected action
-            return random.randint(0, len(self.allowed_actions) - 1)
-        else:  # Return the optimum action
-            return self.Q[s].index(max(self.Q[s]))
-
-    def __get_V(self):
-        """ Compute optimum V from the optimum Q
-        Returns:
-            - Value function
-        """
-        V = {}
-        for s in self.allowed_states:
-            V[s] = max(self.Q[s])
-        return V
+        self.s2i = {s: i for i, s in enumerate(self.allowed_states)}  # Index of each state in Q
+        # Tabular transition model used to simulate the MDP
+        P, self.R = self.mdp.get_transition_tensors()
+        self.P_cum = P.cumsum(-1)
+        self.terminal = self.mdp.get_terminal_mask()
+        # Initialize the Q-values to 0
+        self.Q = np.zeros((len(self.allowed_states), len(self.allowed_actions)))
 
     def __call__(self, num_episodes=10000):
         """ Execute Q-Learning for `num_episodes' episodes
@@ -56,22 +99,27 @@ class QLearning:
             - num_episodes: Number of episodes to run Q-Learning for (int)
         Returns:
             - optimum learnt policy
+            - Mean state values after each episode
         """
-        mean_state_values = [sum(self.__get_V().values())/len(self.allowed_states)]
-        for episode in tqdm(range(num_episodes)):
-            # print(episode)
-            self.eps = 0.9995 * self.eps  # Reduce the exploration is a step-wise manner
-            s, _, episode_end = self.mdp.reset()  # Reset the MDP
-            while not episode_end:
-                a = self.__select_action(s)  # Select the action in epsilon-greedy fashion
-                s_prime, r, episode_end = self.mdp.step(a)  # Execute the MDP
-                self.Q[s][a] = self.Q[s][a] + self.alpha * (r + self.gamma * max(self.Q[s_prime]) - self.Q[s][a])
-                s = s_prime  # Update as current state
-                mean_state_values.append(sum(self.__get_V().values())/len(self.allowed_states))
+        s, _, _ = self.mdp.reset()  # Reset the MDP
+        mean_state_values = np.empty(num_episodes + 1, dtype=np.float32)
+        mean_state_values[0] = self.Q.max(1).mean()
+        _seed(self._rng.getrandbits(32))
+        # Run the episodes in chunks to report the progress
+        chunk = 100
+        with tqdm(total=num_episodes, mininterval=1.0) as progress:
+            for first_episode in range(0, num_episodes, chunk):
+                n = min(chunk, num_episodes - first_episode)
+                self.eps = _q_learning(
+                    self.Q, self.P_cum, self.R, self.terminal, self.s2i[s], first_episode, n,
+                    float(self.alpha), float(self.gamma), float(self.eps), mean_state_values
+                )
+                progress.update(n)
         # Create the optimum policy
         policy = {}
-        for s in self.allowed_states:
-            policy[s] = self.Q[s].index(max(self.Q[s]))
+        optimum_actions = self.Q.argmax(1)
+        for s, i in self.s2i.items():
+            policy[s] = self.allowed_actions[optimum_actions[i]]
 
         return policy, mean_state_values
 
@@ -4,45 +4,76 @@ The experiments are done using all three learning methods
 """
 
 import time
-import matplotlib.pyplot as plt
+from multiprocessing import Pool
 
 from value_iterations import ValueIteration
 from policy_iteration import PolicyIteration
 from q_learning import QLearning
 from mdp import BitStrings
 
-print("\nExperiments on Tiny Bit Strings")
-print("- - - - - - - - - - - - - - - -")
-
-# Create the MDP object
-tiny_bitstrings = BitStrings(size=8)
-
-# Time of exetution and last state-value for different trained
-results = {}
-
-# Experiements using Value Iterations using different hyper-parameters
-print("- Using value iteration")
-begin_tstamp = time.time()
-_, mean_state_values = ValueIteration(tiny_bitstrings, gamma=1, epsilon=0.0001)()
-end_tstamp = time.time()
-results["Value Iteration"] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
-
-# Experiements using Policy Iterations using different hyper-parameters
-print("- Using policy iterations")
-begin_tstamp = time.time()
-_, _, mean_state_values = PolicyIteration(tiny_bitstrings, gamma=0.9, epsilon=0.0001)()
-end_tstamp = time.time()
-results["Policy Iteration"] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
-
-# Experiements using Q-learning using different hyper-parameters
-print("- Using Q learning")
-begin_tstamp = time.time()
-_, mean_state_values = QLearning(tiny_bitstrings, alpha=0.01, eps=1)(num_episodes=35000)
-end_tstamp = time.time()
-results["Q Learning"] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
-
-# Print the results
-print("\n- Results")
-print("\tAlgorithm      Execution time     V(s)")
-for key, value in results.items():
-    print(f"\t{key}     {value[0]:.5f}     {value[1]:.2f}")
+
+def run_value_iteration():
+    """ Execute value iteration on a new Tiny BitStrings MDP
+    Returns:
+        - execution time, last mean state value
+    """
+    tiny_bitstrings = BitStrings(size=8)
+    begin_tstamp = time.time()
+    _, mean_state_values = ValueIteration(tiny_bitstrings, gamma=1, epsilon=0.0001)()
+    end_tstamp = time.time()
+    return end_tstamp - begin_tstamp, mean_state_values[-1]
+
+
+def run_policy_iteration(seed):
+    """ Execute policy iteration on a new Tiny BitStrings MDP
+    Parameters:
+        - seed: seed of the random number generator for the initial policy (int)
+    Returns:
+        - execution time, last mean state value
+    """
+    tiny_bitstrings = BitStrings(size=8)
+    begin_tstamp = time.time()
+    _, _, mean_state_values = PolicyIteration(tiny_bitstrings, gamma=0.9, epsilon=0.0001, seed=seed)()
+    end_tstamp = time.time()
+    return end_tstamp - begin_tstamp, mean_state_values[-1]
+
+
+def run_q_learning(seed):
+    """ Execute Q-learning on a new Tiny BitStrings MDP
+    Parameters:
+        - seed: seed of the random number generator for Q-learning (int)
+    Returns:
+        - execution time, last mean state value
+    """
+    tiny_bitstrings = BitStrings(size=8)
+    begin_tstamp = time.time()
+    _, mean_state_values = QLearning(tiny_bitstrings, alpha=0.01, eps=1, seed=seed)(num_episodes=35000)
+    end_tstamp = time.time()
+    return end_tstamp - begin_tstamp, mean_state_values[-1]
+
+
+if __name__ == "__main__":
+
+    print("\nExperiments on Tiny Bit Strings")
+    print("- - - - - - - - - - - - - - - -")
+
+    # Time of exetution and last state-value for different trained
+    results = {}
+
+    # The three methods are independent, so run them in parallel (the stochastic ones with their own seed)
+    print("- Using value iteration, policy iterations and Q learning")
+    runs = {
+        "Value Iteration": (run_value_iteration, ()),
+        "Policy Iteration": (run_policy_iteration, (1,)),
+        "Q Learning": (run_q_learning, (2,)),
+    }
+    with Pool(len(runs)) as pool:
+        async_results = {key: pool.apply_async(run, args) for key, (run, args) in runs.items()}
+        for key, async_result in async_results.items():
+            results[key] = list(async_result.get())
+
+    # Print the results
+    print("\n- Results")
+    print("\tAlgorithm      Execution time     V(s)")
+    for key, value in results.items():
+        print(f"\t{key}     {value[0]:.5f}     {value[1]:.2f}")
@@ -5,150 +5,187 @@ The experiments are done using all three learning methods
 
 import time
 import matplotlib.pyplot as plt
+from multiprocessing import Pool
 
-from value_iterations import ValueIteration
+from value_iterations import BatchedValueIteration
 from policy_iteration import PolicyIteration
 from q_learning import QLearning
 from mdp import TomAndJerry
 
-print("\nExperiments on Tom and Jerry")
-print("- - - - - - - - - - - - - -")
 
-# Create the MDP object
-tom_and_jerry = TomAndJerry()
+def run_policy_iteration(hyper_params, seed):
+    """ Execute policy iteration on a new Tom & Jerry MDP
+    Parameters:
+        - hyper_params: (gamma, eps)
+        - seed: seed of the random number generator for the initial policy (int)
+    Returns:
+        - trained policy, mean policy changes, mean state values, execution time
+    """
+    gamma, eps = hyper_params
+    tom_and_jerry = TomAndJerry()
+    begin_tstamp = time.time()
+    policy_iter = PolicyIteration(tom_and_jerry, gamma=gamma, epsilon=eps, seed=seed)
+    trained_policy, mean_policy_changes, mean_state_values = policy_iter()
+    end_tstamp = time.time()
+    return trained_policy, mean_policy_changes, mean_state_values, end_tstamp - begin_tstamp
 
-# Colors used for plotting
-colors = ['blue', 'green', 'black', 'pink', 'orange', 'blue', 'green', 'black', 'pink']
-linestyles = ["-", "-", "-", "-", "-", "--", "--", "--", "--"]
 
-# Experiements using Value Iterations using different hyper-parameters
-print("\n- Using value iterations")
-fig = plt.figure(figsize=(10,8))
-ax = fig.add_subplot(1,1,1)
-grid_search = [(0.1, 0.0001), (0.9, 0.0001), (1, 0.0001), (1, 0.1)]  # List of hyper-param (gamma, eps)
-vi_results = {}   # Time of exetution and last state-value for different hyperparameter value
-optimum_policy = None
-best_state_value = 0
-c_i = 0
-for gamma, eps in grid_search:
+def run_q_learning(hyper_params, seed):
+    """ Execute Q-learning on a new Tom & Jerry MDP
+    Parameters:
+        - hyper_params: (alpha, eps)
+        - seed: seed of the random number generator for Q-learning (int)
+    Returns:
+        - trained policy, mean state values, execution time
+    """
+    alpha, eps = hyper_params
+    tom_and_jerry = TomAndJerry()
     begin_tstamp = time.time()
-    value_iter = ValueIteration(tom_and_jerry, gamma=gamma, epsilon=eps)
-    trained_policy, mean_state_values = value_iter()
-    ax.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
+    q_learning = QLearning(tom_and_jerry, alpha=alpha, eps=eps, seed=seed)
+    trained_policy, mean_state_values = q_learning()
     end_tstamp = time.time()
-    vi_results[(gamma, eps)] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
-    if mean_state_values[-1] > best_state_value:
-        optimum_policy = trained_policy
-        best_state_value = mean_state_values[-1]
-    c_i += 1
-ax.set_xlabel("Number of iterations")
-ax.set_ylabel("Average state value V(s)")
-ax.set_title("Average state value VS No. of iterations for Value Iterations")
-ax.legend()
-fig.savefig("./plots/tom_and_jerry_value_iterations.png")
-plt.close(fig)
-print("  - Results")
-print("\tGamma\tEpsilon\tExecution time\tV(s)")
-for key, value in vi_results.items():
-    print(f"\t{key[0]}\t{key[1]}\t{value[0]:.5f}\t\t{value[1]:.2f}")
-print("  - Optimum policy")
-for r in range(4):
-    print("\t", end="")
-    for c in range(4):
-        if (r,c) not in optimum_policy:
-            print("N", end=" ")
-        else:
-            print(optimum_policy[(r,c)], end=" ")
-    print()
-print()
+    return trained_policy, mean_state_values, end_tstamp - begin_tstamp
+
+
+if __name__ == "__main__":
+
+    print("\nExperiments on Tom and Jerry")
+    print("- - - - - - - - - - - - - -")
 
-# Experiements using Policy Iterations using different hyper-parameters
-print("\n- Using policy iterations")
-fig1 = plt.figure(figsize=(10,8))
-ax1 = fig1.add_subplot(1,1,1)
-fig2 = plt.figure(figsize=(10,8))
-ax2 = fig2.add_subplot(1,1,1)
-grid_search = [(0.1, 0.0001), (0.9, 0.0001), (1, 0.0001), (1, 0.1)]  # List of hyper-param (gamma, eps)
-pi_results = {}   # Time of exetution and last state-value for different hyperparameter value
-optimum_policy = None
-best_state_value = 0
-c_i = 0
-for gamma, eps in grid_search:
+    # Create the MDP object
+    tom_and_jerry = TomAndJerry()
+
+    # Colors used for plotting
+    colors = ['blue', 'green', 'black', 'pink', 'orange', 'blue', 'green', 'black', 'pink']
+    linestyles = ["-", "-", "-", "-", "-", "--", "--", "--", "--"]
+
+    # Experiements using Value Iterations using different hyper-parameters
+    print("\n- Using value iterations")
+    fig = plt.figure(figsize=(10,8))
+    ax = fig.add_subplot(1,1,1)
+    grid_search = [(0.1, 0.0001), (0.9, 0.0001), (1, 0.0001), (1, 0.1)]  # List of hyper-param (gamma, eps)
+    vi_results = {}   # Last state-value for different hyperparameter value
+    optimum_policy = None
+    best_state_value = 0
+    c_i = 0
+    # All the hyper-params are swept together, so they share the execution time
     begin_tstamp = time.time()
-    policy_iter = PolicyIteration(tom_and_jerry, gamma=gamma, epsilon=eps)
-    trained_policy, mean_policy_changes, mean_state_values = policy_iter()
-    ax1.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
-    ax2.plot(mean_policy_changes, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
+    batched_results = BatchedValueIteration(tom_and_jerry, grid_search)()
     end_tstamp = time.time()
-    pi_results[(gamma, eps)] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
-    if mean_state_values[-1] > best_state_value:
-        optimum_policy = trained_policy
-        best_state_value = mean_state_values[-1]
-    c_i += 1
-ax1.set_xlabel("Number of iterations")
-ax1.set_ylabel("Average state value V(s)")
-ax1.set_title("Average state value VS No. of iterations for Policy Iterations")
-ax1.legend()
-fig1.savefig("./plots/tom_and_jerry_policy_iterations_V.png")
-plt.close(fig1)
-ax2.set_xlabel("Number of iterations")
-ax2.set_ylabel("Mean policy changes")
-ax2.set_title("Mean policy changes VS No. of iterations for Policy Iterations")
-ax2.legend()
-fig2.savefig("./plots/tom_and_jerry_policy_iterations_policy_changes.png")
-plt.close(fig2)
-print("  - Results")
-print("\tGamma\tEpsilon\tExecution time\tV(s)")
-for key, value in pi_results.items():
-    print(f"\t{key[0]}\t{key[1]}\t{value[0]:.5f}\t\t{value[1]:.2f}")
-print("  - Optimum policy")
-for r in range(4):
-    print("\t", end="")
-    for c in range(4):
-        if (r,c) not in optimum_policy:
-            print("N", end=" ")
-        else:
-            print(optimum_policy[(r,c)], end=" ")
+    for (gamma, eps), (trained_policy, mean_state_values) in zip(grid_search, batched_results):
+        ax.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
+        vi_results[(gamma, eps)] = mean_state_values[-1]
+        if mean_state_values[-1] > best_state_value:
+            optimum_policy = trained_policy
+            best_state_value = mean_state_values[-1]
+        c_i += 1
+    ax.set_xlabel("Number of iterations")
+    ax.set_ylabel("Average state value V(s)")
+    ax.set_title("Average state value VS No. of iterations for Value Iterations")
+    ax.legend()
+    fig.savefig("./plots/tom_and_jerry_value_iterations.png")
+    plt.close(fig)
+    print("  - Results")
+    print(f"\tExecution time of the batched sweep: {end_tstamp - begin_tstamp:.5f}")
+    print("\tGamma\tEpsilon\tV(s)")
+    for key, value in vi_results.items():
+        print(f"\t{key[0]}\t{key[1]}\t{value:.2f}")
+    print("  - Optimum policy")
+    for r in range(4):
+        print("\t", end="")
+        for c in range(4):
+            if (r,c) not in optimum_policy:
+                print("N", end=" ")
+            else:
+                print(optimum_policy[(r,c)], end=" ")
+        print()
     print()
-print()
 
-# Experiements using Q-learning using different hyper-parameters
-print("\n- Using Q learning")
-fig = plt.figure(figsize=(10,8))
-ax = fig.add_subplot(1,1,1)
-grid_search = [(0.001, 1), (0.01, 1), (0.01, 0.5), (0.001, 0.5)]  # List of hyper-param (gamma, eps)
-ql_results = {}   # Time of exetution and last state-value for different hyperparameter value
-optimum_policy = None
-best_state_value = 0
-c_i = 0
-for alpha, eps in grid_search:
-    begin_tstamp = time.time()
-    q_learning = QLearning(tom_and_jerry, alpha=alpha, eps=eps)
-    trained_policy, mean_state_values = q_learning()
-    ax.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Alpha = {alpha}, Epsilon = {eps}")
-    end_tstamp = time.time()
-    ql_results[(alpha, eps)] = [end_tstamp - begin_tstamp, mean_state_values[-1]]
-    if mean_state_values[-1] > best_state_value:
-        optimum_policy = trained_policy
-        best_state_value = mean_state_values[-1]
-    c_i += 1
-ax.set_xlabel("Number of iterations")
-ax.set_ylabel("Average state value V(s)")
-ax.set_title("Average state value VS No. of iterations for Policy Iterations")
-ax.legend()
-fig.savefig("./plots/tom_and_jerry_q_learning.png")
-plt.close(fig)
-print("  - Results")
-print("\tAlpha\tEpsilon\tExecution time\tV(s)")
-for key, value in ql_results.items():
-    print(f"\t{key[0]}\t{key[1]}\t{value[0]:.5f}\t\t{value[1]:.2f}")
-print("  - Optimum policy")
-for r in range(4):
-    print("\t", end="")
-    for c in range(4):
-        if (r,c) not in optimum_policy:
-            print("N", end=" ")
-        else:
-            print(optimum_policy[(r,c)], end=" ")
+    # Experiements using Policy Iterations using different hyper-parameters
+    print("\n- Using policy iterations")
+    fig1 = plt.figure(figsize=(10,8))
+    ax1 = fig1.add_subplot(1,1,1)
+    fig2 = plt.figure(figsize=(10,8))
+    ax2 = fig2.add_subplot(1,1,1)
+    grid_search = [(0.1, 0.0001), (0.9, 0.0001), (1, 0.0001), (1, 0.1)]  # List of hyper-param (gamma, eps)
+    pi_results = {}   # Time of exetution and last state-value for different hyperparameter value
+    optimum_policy = None
+    best_state_value = 0
+    c_i = 0
+    # The hyper-params are independent, so run them in parallel (seeded with their index)
+    with Pool(len(grid_search)) as pool:
+        pi_runs = pool.starmap(run_policy_iteration, [(hp, seed) for seed, hp in enumerate(grid_search)])
+    for (gamma, eps), (trained_policy, mean_policy_changes, mean_state_values, exec_time) in zip(grid_search, pi_runs):
+        ax1.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
+        ax2.plot(mean_policy_changes, color=colors[c_i], linestyle=linestyles[c_i], label=f"Gamma = {gamma}, Epsilon = {eps}")
+        pi_results[(gamma, eps)] = [exec_time, mean_state_values[-1]]
+        if mean_state_values[-1] > best_state_value:
+            optimum_policy = trained_policy
+            best_state_value = mean_state_values[-1]
+        c_i += 1
+    ax1.set_xlabel("Number of iterations")
+    ax1.set_ylabel("Average state value V(s)")
+    ax1.set_title("Average state value VS No. of iterations for Policy Iterations")
+    ax1.legend()
+    fig1.savefig("./plots/tom_and_jerry_policy_iterations_V.png")
+    plt.close(fig1)
+    ax2.set_xlabel("Number of iterations")
+    ax2.set_ylabel("Mean policy changes")
+    ax2.set_title("Mean policy changes VS No. of iterations for Policy Iterations")
+    ax2.legend()
+    fig2.savefig("./plots/tom_and_jerry_policy_iterations_policy_changes.png")
+    plt.close(fig2)
+    print("  - Results")
+    print("\tGamma\tEpsilon\tExecution time\tV(s)")
+    for key, value in pi_results.items():
+        print(f"\t{key[0]}\t{key[1]}\t{value[0]:.5f}\t\t{value[1]:.2f}")
+    print("  - Optimum policy")
+    for r in range(4):
+        print("\t", end="")
+        for c in range(4):
+            if (r,c) not in optimum_policy:
+                print("N", end=" ")
+            else:
+                print(optimum_policy[(r,c)], end=" ")
+        print()
+    print()
+
+    # Experiements using Q-learning using different hyper-parameters
+    print("\n- Using Q learning")
+    fig = plt.figure(figsize=(10,8))
+    ax = fig.add_subplot(1,1,1)
+    grid_search = [(0.001, 1), (0.01, 1), (0.01, 0.5), (0.001, 0.5)]  # List of hyper-param (gamma, eps)
+    ql_results = {}   # Time of exetution and last state-value for different hyperparameter value
+    optimum_policy = None
+    best_state_value = 0
+    c_i = 0
+    # The hyper-params are independent, so run them in parallel (seeded with their index)
+    with Pool(len(grid_search)) as pool:
+        ql_runs = pool.starmap(run_q_learning, [(hp, seed) for seed, hp in enumerate(grid_search)])
+    for (alpha, eps), (trained_policy, mean_state_values, exec_time) in zip(grid_search, ql_runs):
+        ax.plot(mean_state_values, color=colors[c_i], linestyle=linestyles[c_i], label=f"Alpha = {alpha}, Epsilon = {eps}")
+        ql_results[(alpha, eps)] = [exec_time, mean_state_values[-1]]
+        if mean_state_values[-1] > best_state_value:
+            optimum_policy = trained_policy
+            best_state_value = mean_state_values[-1]
+        c_i += 1
+    ax.set_xlabel("Number of episodes")
+    ax.set_ylabel("Average state value V(s)")
+    ax.set_title("Average state value VS No. of episodes for Q Learning")
+    ax.legend()
+    fig.savefig("./plots/tom_and_jerry_q_learning.png")
+    plt.close(fig)
+    print("  - Results")
+    print("\tAlpha\tEpsilon\tExecution time\tV(s)")
+    for key, value in ql_results.items():
+        print(f"\t{key[0]}\t{key[1]}\t{value[0]:.5f}\t\t{value[1]:.2f}")
+    print("  - Optimum policy")
+    for r in range(4):
+        print("\t", end="")
+        for c in range(4):
+            if (r,c) not in optimum_policy:
+                print("N", end=" ")
+            else:
+                print(optimum_policy[(r,c)], end=" ")
+        print()
     print()
-print()
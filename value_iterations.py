@@ -1,46 +1,148 @@
 # This module implements the value iteration
 
+import heapq
+import numpy as np
+
+
+class BatchedValueIteration:
+
+    """ Finds optimum policies using value iteration for several hyper-parameters at once """
+
+    def __init__(self, mdp, grid_search):
+        """ Constructor
+        Parameters:
+            - mdp: Markov devision process object
+            - grid_search: List of hyper-params (gamma, epsilon)
+        """
+        self.mdp = mdp    # MDP to train policies for
+        self.gammas = np.array([gamma for gamma, _ in grid_search], dtype=float)
+        self.eps = np.array([eps for _, eps in grid_search], dtype=float)
+        self.allowed_states, self.allowed_actions = self.mdp.get_allowed_states_and_actions()
+        self.s2i = {s: i for i, s in enumerate(self.allowed_states)}  # Index of each state in V
+        # Transition and reward tensors indexed as [s, a, s']
+        self.P, self.R = self.mdp.get_transition_tensors()
+        self.r = (self.P * self.R).sum(-1)  # Expected immediate rewards [s, a]
+        # Initialize the state values to 0, one row per hyper-param
+        self.V = np.zeros((len(grid_search), len(self.allowed_states)))  # Value functions
+
+    def __Q(self, idx):
+        """ Evaluate optimum Q(s,a) for all the states and actions
+        Parameters:
+            - idx: Indices of the hyper-params to evaluate Q for (np.ndarray)
+        Returns:
+            Optimum Q (np.ndarray of shape [len(idx), S, A])
+        """
+        # P @ V for all the hyper-params at once is of shape [S, A, len(idx)]
+        expected_values = np.moveaxis(self.P @ self.V[idx].T, -1, 0)
+        return self.r[None] + self.gammas[idx, None, None] * expected_values
+
+    def __call__(self):
+        """ Execute the value iterations using Bellman Equation
+        Returns:
+            List of (optimum policy, mean state values as the iteration processes) for each hyper-param
+        """
+        # Update using Bellman Equation till every hyper-param converges
+        mean_state_values = [[v] for v in self.V.mean(1)]
+        not_converged = np.ones(len(self.gammas), dtype=bool)
+        while not_converged.any():
+            idx = np.nonzero(not_converged)[0]
+            V_new = self.__Q(idx).max(-1)
+            delta = np.max(np.abs(V_new - self.V[idx]), axis=1)
+            self.V[idx] = V_new
+            for k, g in enumerate(idx):
+                mean_state_values[g].append(V_new[k].mean())
+            not_converged[idx] = delta >= self.eps[idx]
+        return list(zip(self.get_policies(), mean_state_values))
+
+    def get_policies(self):
+        """ Evaluate the optimum policies from the current state values
+        Returns:
+            List of optimum policies for each hyper-param
+        """
+        optimum_actions = self.__Q(np.arange(len(self.gammas))).argmax(-1)
+        policies = []
+        for g in range(len(self.gammas)):
+            policy = {}
+            for s, i in self.s2i.items():
+                policy[s] = self.allowed_actions[optimum_actions[g, i]]
+            policies.append(policy)
+        return policies
+
 
 class ValueIteration:
 
     """ Finds optimum policy using value iteration """
 
-    def __init__(self, mdp, gamma=0.9, epsilon=0.0001):
+    def __init__(self, mdp, gamma=0.9, epsilon=0.0001, prioritized=False):
         """ Constructor
         Parameters:
             - mdp: Markov devision process object
             - gamma: Discount factor
             - epsilon: The threshold to stop the value iterations
+            - prioritized: Update one state at a time in the order of Bellman residuals (bool),
+              this needs fewer backups than synchronous sweeps but is slower in wall time, as
+              every single state update is a separate numpy call
         """
         self.mdp = mdp    # MDP to train policy for
         self.gamma = gamma
         self.eps = epsilon
-        self.V = {}       # Value function
+        self.prioritized = prioritized
         self.policy = {}  # Trained policy
-        # Initialize the state values to 0
-        self.allowed_states, self.allowed_actions = self.mdp.get_allowed_states_and_actions()
-        for s in self.allowed_states:
-            self.V[s] = 0
+        # Synchronous sweeps and policy extraction are a batch of one hyper-param
+        self.batched = BatchedValueIteration(mdp, [(gamma, epsilon)])
+        self.allowed_states, self.allowed_actions = self.batched.allowed_states, self.batched.allowed_actions
+        self.s2i = self.batched.s2i  # Index of each state in V
+        # Sparse successors [(s', p, r), ...] of each (s, a) for the single state updates
+        self.successors = self.mdp.get_successors() if prioritized else None
+        self.V = self.batched.V[0]  # Value function (view of the batch row, updated in-place)
 
-    def __get_mean_V(self):
-        """ Evaluate mean state-value across all states
+    def __backups(self, states):
+        """ Evaluate the Bellman backups max_a Q(s,a) for a few states at once
+        Parameters:
+            - states: Indices of the states (np.ndarray)
         Returns:
-            mean V (int)
+            Backed-up state values (np.ndarray of shape [len(states)])
         """
-        return sum(self.V.values())/len(self.V)
+        return (self.batched.r[states] + self.gamma * (self.batched.P[states] @ self.V)).max(-1)
 
-    def __Q(self, s, a):
-        """ Evaluate optimum Q(s,a)
-        Paramaters:
-            - s: Current state
-            - a: Current action
+    def __prioritized_sweeps(self):
+        """ Update the state with largest Bellman residual one at a time till convergence
         Returns:
-            Optimum Q(s,a)
+            Mean state values after every S updates
         """
-        Q_s_a = 0
-        for s_prime in self.allowed_states:
-            Q_s_a += self.mdp.get_transition_prob(s, a, s_prime) * (self.mdp.get_reward(s, a, s_prime) + self.gamma * self.V[s_prime])
-        return Q_s_a
+        S = len(self.allowed_states)
+        # States which can transition into each state
+        predecessors = [set() for _ in range(S)]
+        for s in range(S):
+            for successors in self.successors[s]:
+                for s_prime, _, _ in successors:
+                    predecessors[s_prime].add(s)
+        predecessors = [np.array(sorted(preds), dtype=int) for preds in predecessors]
+        # Max-heap of (-residual, state), entries not matching `residual' are stale
+        residual = np.abs(self.__backups(np.arange(S)) - self.V)
+        heap = [(-residual[s], s) for s in range(S)]
+        heapq.heapify(heap)
+        mean_state_values = [self.V.mean()]
+        n_updates = 0
+        while heap:
+            neg_residual, s = heapq.heappop(heap)
+            if -neg_residual != residual[s]:
+                continue
+            # The largest residual is below the threshold for all the states
+            if residual[s] < self.eps:
+                break
+            self.V[s] = self.__backups(s)
+            residual[s] = 0
+            n_updates += 1
+            if n_updates % S == 0:
+                mean_state_values.append(self.V.mean())
+            # Update the residuals of the states affected by V[s]
+            preds = predecessors[s]
+            residual[preds] = np.abs(self.__backups(preds) - self.V[preds])
+            for p, res in zip(preds.tolist(), residual[preds].tolist()):
+                heapq.heappush(heap, (-res, p))
+        mean_state_values.append(self.V.mean())
+        return mean_state_values
 
     def __call__(self):
         """ Execute the value iteration using Bellman Equation
@@ -49,20 +151,11 @@ class ValueIteration:
             - Mean state values as the iteration processes
         """
         # Update using Bellman Equation till convergence
-        mean_state_values = [self.__get_mean_V()]  # Average state-values as the iteration progresses
-        while True:
-            delta = 0
-            for s in self.allowed_states:
-                old_v = self.V[s]
-                self.V[s] = max([self.__Q(s, a) for a in self.allowed_actions])
-                delta = max(delta, abs(old_v - self.V[s]))
-            mean_state_values.append(self.__get_mean_V())
-            if delta < self.eps:
-                break
-        # Evaluate the optimum policy
-        for s in self.allowed_states:
-            Q_s = [self.__Q(s,a) for a in self.allowed_actions]
-            self.policy[s] = Q_s.index(max(Q_s))
+        if self.prioritized:
+            mean_state_values = self.__prioritized_sweeps()
+            self.policy = self.batched.get_policies()[0]
+        else:
+            (self.policy, mean_state_values), = self.batched()
         return self.policy, mean_state_values
 
 